@@ -3,10 +3,7 @@ Main Flask application factory
 """
 from flask import Flask
 from flask_wtf.csrf import CSRFProtect
-from config import *
-from app.models import db
 from app.error_logging import setup_logging
-from app.mongo_handler import MongoDBHandler
 import logging
 
 # CSRF protection
@@ -16,19 +13,26 @@ csrf = CSRFProtect()
 mongo_db = None
 
 
-def create_app(config_name='development'):
+def create_app(config_name='development', test_config=None):
     """
     Application factory function.
     Creates and configures the Flask application.
+    test_config overrides settings before extensions are initialized.
     """
     global mongo_db
 
+    # Deferred so importing the package does not load SQLAlchemy or pymongo
+    from app.models import db
+    from app.mongo_handler import MongoDBHandler
+
     app = Flask(__name__, 
                 template_folder='templates',
                 static_folder='static')
 
     # Load configuration
     app.config.from_object('config')
+    if test_config:
+        app.config.update(test_config)
 
     # Initialize extensions
     db.init_app(app)
@@ -88,5 +92,4 @@ def create_app(config_name='development'):
 
 def get_mongo_db():
     """Get MongoDB handler instance"""
-    global mongo_db
     return mongo_db
@@ -2,25 +2,95 @@
 Error handling and logging utilities
 SECURITY FEATURE: Error Logging & Monitoring
 """
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
+import threading
 from datetime import datetime
 
+security_logger = logging.getLogger('security')
+
+
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotating file handler that batches writes.
+    Records are buffered and written together when the buffer is full,
+    when a record of ERROR or above arrives, or after flush_interval seconds.
+    emit is overridden, so rollover is checked in _write_buffer against a
+    file size tracked in memory, needing no syscalls.
+    """
+    def __init__(self, filename, maxBytes=0, backupCount=0,
+                 capacity=100, flush_interval=1.0, **kwargs):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, **kwargs)
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._timer = None
+        self._size = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+
+    def emit(self, record):
+        """Buffer a formatted record, flushing when required"""
+        try:
+            self._buffer.append(self.format(record))
+            if len(self._buffer) >= self.capacity or record.levelno >= logging.ERROR:
+                self._write_buffer()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """Write any buffered records and flush the stream"""
+        self.acquire()
+        try:
+            self._write_buffer()
+        finally:
+            self.release()
+        super().flush()
+
+    def doRollover(self):
+        """Rotate log files and reset the tracked size"""
+        super().doRollover()
+        self._size = 0
+
+    def _write_buffer(self):
+        """Write buffered records in one call. Caller must hold the handler lock."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+        data = self.terminator.join(self._buffer) + self.terminator
+        self._buffer = []
+        if self.stream is None:
+            self.stream = self._open()
+        # The file grows by encoded bytes, not characters
+        size = len(data.encode(self.encoding or 'utf-8'))
+        if self.maxBytes > 0 and self._size + size >= self.maxBytes:
+            self.doRollover()
+        self.stream.write(data)
+        self.stream.flush()
+        self._size += size
+
 
 def setup_logging(app):
     """
     Configure application logging.
     Logs are written to file for security audit trail.
+    File writes happen on a background listener thread so request
+    handlers only enqueue records.
     """
     # Create logs directory if it doesn't exist
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
+    os.makedirs('logs', exist_ok=True)
 
     # Configure file handler for security events
-    security_handler = logging.handlers.RotatingFileHandler(
+    security_handler = BufferedRotatingFileHandler(
         'logs/security.log',
-        maxBytes=10485760,  # 10MB
+        maxBytes=67108864,  # 64MB
         backupCount=20
     )
     security_handler.setLevel(logging.WARNING)
@@ -30,27 +100,33 @@ def setup_logging(app):
     security_handler.setFormatter(security_format)
 
     # Configure file handler for general application logs
-    app_handler = logging.handlers.RotatingFileHandler(
+    app_handler = BufferedRotatingFileHandler(
         'logs/app.log',
-        maxBytes=10485760,  # 10MB
+        maxBytes=67108864,  # 64MB
         backupCount=10
     )
     app_handler.setLevel(logging.INFO)
     app_handler.setFormatter(security_format)
 
     # Configure handler for authentication events
-    auth_handler = logging.handlers.RotatingFileHandler(
+    auth_handler = BufferedRotatingFileHandler(
         'logs/auth.log',
-        maxBytes=5242880,  # 5MB
+        maxBytes=67108864,  # 64MB
         backupCount=10
     )
     auth_handler.setLevel(logging.INFO)
     auth_handler.setFormatter(security_format)
 
-    # Add handlers to app logger
-    app.logger.addHandler(security_handler)
-    app.logger.addHandler(app_handler)
-    app.logger.addHandler(auth_handler)
+    # Route app logger records through a queue to the file handlers
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(
+        log_queue, security_handler, app_handler, auth_handler,
+        respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+
+    app.logger.addHandler(logging.handlers.QueueHandler(log_queue))
     app.logger.setLevel(logging.INFO)
 
     return app.logger
@@ -66,27 +142,23 @@ class SecurityLogger:
         event = f"Login {'successful' if success else 'failed'} for user: {username}"
         if ip_address:
             event += f" from IP: {ip_address}"
-        logger = logging.getLogger('security')
         level = logging.INFO if success else logging.WARNING
-        logger.log(level, event)
+        security_logger.log(level, event)
 
     @staticmethod
     def log_patient_access(user_id: str, patient_id: str, action: str):
         """Log patient data access"""
-        logger = logging.getLogger('security')
-        logger.info(f"User {user_id} performed '{action}' on patient {patient_id}")
+        security_logger.info(f"User {user_id} performed '{action}' on patient {patient_id}")
 
     @staticmethod
     def log_validation_error(field: str, error: str, user_id: str = None):
         """Log validation errors"""
-        logger = logging.getLogger('security')
         msg = f"Validation error in field '{field}': {error}"
         if user_id:
             msg += f" (User: {user_id})"
-        logger.warning(msg)
+        security_logger.warning(msg)
 
     @staticmethod
     def log_suspicious_activity(description: str, user_id: str = None):
         """Log suspicious activities"""
-        logger = logging.getLogger('security')
-        logger.warning(f"Suspicious activity: {description}")
+        security_logger.warning(f"Suspicious activity: {description}")
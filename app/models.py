@@ -1,12 +1,84 @@
 """
 Database initialization and models for user authentication (SQLite)
 """
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import hashlib
+import hmac
+import secrets
+import sqlite3
+import threading
+import time
 
 db = SQLAlchemy()
 
+# Recently verified credentials: (user_id, password_hash, password digest) -> expiry.
+# Digests are keyed with a per-process secret so plaintext-equivalent hashes
+# are never held in memory. Only successful verifications are cached.
+PASSWORD_VERIFY_TTL = 60  # seconds
+PASSWORD_VERIFY_CACHE_SIZE = 1024
+_verify_key = secrets.token_bytes(32)
+_verify_cache = {}
+_verify_lock = threading.Lock()
+
+
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune SQLite connections for write throughput.
+    WAL journaling with NORMAL sync avoids the rollback-journal fsyncs
+    on every commit while remaining safe against corruption.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA cache_size=-64000')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+
+def verify_password(password_hash, password, user_id=None):
+    """
+    Verify a password against a stored hash.
+    Successful checks for a known user are cached for PASSWORD_VERIFY_TTL
+    seconds so repeat logins skip the PBKDF2 computation.
+    """
+    if user_id is None:
+        return check_password_hash(password_hash, password)
+
+    digest = hmac.new(_verify_key, password.encode('utf-8'), hashlib.sha256).digest()
+    key = (user_id, password_hash, digest)
+    now = time.monotonic()
+    with _verify_lock:
+        expires = _verify_cache.get(key)
+        if expires is not None and now < expires:
+            return True
+
+    if not check_password_hash(password_hash, password):
+        return False
+
+    with _verify_lock:
+        if len(_verify_cache) >= PASSWORD_VERIFY_CACHE_SIZE:
+            for stale in [k for k, exp in _verify_cache.items() if exp <= now]:
+                del _verify_cache[stale]
+            if len(_verify_cache) >= PASSWORD_VERIFY_CACHE_SIZE:
+                del _verify_cache[next(iter(_verify_cache))]
+        _verify_cache[key] = now + PASSWORD_VERIFY_TTL
+    return True
+
+
+def forget_verified_password(user_id):
+    """Drop cached verifications for a user"""
+    with _verify_lock:
+        for key in [k for k in _verify_cache if k[0] == user_id]:
+            del _verify_cache[key]
+
 
 class User(db.Model):
     """
@@ -29,11 +101,16 @@ class User(db.Model):
         """Hash and set password - SECURITY FEATURE: Password Hashing"""
         if len(password) < 8:
             raise ValueError("Password must be at least 8 characters long")
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        method = 'pbkdf2:sha256'
+        if has_app_context():
+            method = current_app.config.get('PASSWORD_HASH_METHOD', method)
+        self.password_hash = generate_password_hash(password, method=method)
+        if self.id is not None:
+            forget_verified_password(self.id)
 
     def check_password(self, password):
         """Verify password against stored hash"""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password, self.id)
 
     def __repr__(self):
         return f'<User {self.username}>'
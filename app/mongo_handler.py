@@ -1,11 +1,12 @@
 """
 MongoDB database handler for patient records
 """
-from pymongo import MongoClient
-from pymongo.errors import PyMongoError
+from pymongo import MongoClient, UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError, PyMongoError
 from bson.objectid import ObjectId
 import logging
 from datetime import datetime
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -27,35 +28,110 @@ class MongoDBHandler:
             self.db = None
             self.patients_collection = None
 
-    def count_patients(self) -> int:
+    def count_patients(self, query: dict = None) -> int:
         """
-        Return the total number of patients in the collection.
+        Return the number of patients in the collection.
+        Uses collection metadata when no filter is given.
         """
         try:
-            return self.patients_collection.count_documents({})
+            if query:
+                return self.patients_collection.count_documents(query)
+            return self.patients_collection.estimated_document_count()
         except Exception as e:
             logger.error(f"Error counting patients: {str(e)}")
             return 0
 
+    def stroke_stats(self) -> Optional[dict]:
+        """
+        Return total patient and stroke case counts in a single aggregation.
+        Stroke may be stored as an int or a string depending on its source.
+        Returns None if the query fails, so callers can avoid caching it.
+        """
+        try:
+            result = list(self.patients_collection.aggregate([
+                {'$group': {
+                    '_id': None,
+                    'total': {'$sum': 1},
+                    'strokes': {'$sum': {'$cond': [{'$in': ['$stroke', [1, '1']]}, 1, 0]}}
+                }}
+            ]))
+            if result:
+                return {'total': result[0]['total'], 'strokes': result[0]['strokes']}
+            return {'total': 0, 'strokes': 0}
+        except Exception as e:
+            logger.error(f"Error computing stroke stats: {str(e)}")
+            return None
+
     def create_patient(self, patient_data: dict) -> dict:
         """
         Create a new patient record.
         Adds timestamp and sequential ID automatically.
         """
         try:
-            # Generate a sequential ID
-            last_patient = self.patients_collection.find_one(sort=[('id', -1)])
-            next_id = (last_patient.get('id', 0) if last_patient else 0) + 1
-            patient_data['id'] = next_id
-            patient_data['created_at'] = datetime.utcnow()
-            patient_data['updated_at'] = datetime.utcnow()
-            result = self.patients_collection.insert_one(patient_data)
+            next_id = self._next_patient_id()
+            patient = self._prepare_patient(patient_data, next_id, datetime.utcnow())
+            result = self.patients_collection.insert_one(patient)
             logger.info(f"Patient created with MongoDB ID: {result.inserted_id} and Patient ID: {next_id}")
             return {'success': True, 'id': str(result.inserted_id)}
         except PyMongoError as e:
             logger.error(f"Error creating patient: {str(e)}")
             return {'success': False, 'error': str(e)}
 
+    def upsert_patients_bulk(self, patients: list, write_concern: WriteConcern = None,
+                             bypass_document_validation: bool = False) -> dict:
+        """
+        Insert patients that are not already stored, in a single bulk_write.
+        Each document must carry a stable '_id'; documents whose '_id' already
+        exists are left untouched, which makes repeated seeding idempotent.
+        bypass_document_validation skips any collection validator for trusted
+        data; MongoDB only allows it with acknowledged writes, so it is ignored
+        when write_concern is unacknowledged.
+        'count' is the number of patients inserted, or the number sent when
+        'acknowledged' is False.
+        """
+        try:
+            next_id = self._next_patient_id()
+            now = datetime.utcnow()
+            ops = []
+            for i, patient in enumerate(patients):
+                doc = self._prepare_patient(patient, next_id + i, now)
+                doc_id = doc.pop('_id')
+                ops.append(UpdateOne({'_id': doc_id}, {'$setOnInsert': doc}, upsert=True))
+            if not ops:
+                return {'success': True, 'count': 0, 'acknowledged': True}
+            collection = self.patients_collection
+            if write_concern is not None:
+                collection = collection.with_options(write_concern=write_concern)
+            bypass = bypass_document_validation and collection.write_concern.acknowledged
+            result = collection.bulk_write(ops, ordered=False, bypass_document_validation=bypass)
+            if not result.acknowledged:
+                # Unacknowledged writes report no counts, only what was sent
+                logger.info(f"{len(ops)} patient upserts sent unacknowledged")
+                return {'success': True, 'count': len(ops), 'acknowledged': False}
+            logger.info(f"{result.upserted_count} patients upserted in bulk")
+            return {'success': True, 'count': result.upserted_count, 'acknowledged': True}
+        except BulkWriteError as e:
+            upserted = e.details.get('nUpserted', 0)
+            logger.error(f"Bulk patient upsert partially failed ({upserted} inserted): {str(e)}")
+            return {'success': False, 'count': upserted, 'acknowledged': True, 'error': str(e)}
+        except PyMongoError as e:
+            logger.error(f"Error upserting patients in bulk: {str(e)}")
+            return {'success': False, 'count': 0, 'acknowledged': True, 'error': str(e)}
+
+    def _next_patient_id(self) -> int:
+        """Return the next sequential patient ID"""
+        last_patient = self.patients_collection.find_one(sort=[('id', -1)])
+        return (last_patient.get('id', 0) if last_patient else 0) + 1
+
+    @staticmethod
+    def _prepare_patient(patient_data: dict, patient_id: int, timestamp: datetime) -> dict:
+        """Return a copy of patient_data with its ID and timestamps set"""
+        patient = dict(patient_data)
+        patient['id'] = patient_id
+        patient['created_at'] = timestamp
+        patient['updated_at'] = timestamp
+        return patient
+
     def read_patient(self, patient_id: str) -> dict:
         """
         Read a single patient record by ID.
@@ -1,20 +1,37 @@
 ﻿"""
 Application routes for authentication, patients, and main pages
 """
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, current_app
 from flask_wtf.csrf import generate_csrf
-from app.models import db, User
+from sqlalchemy import bindparam, select
+from app.models import db, User, verify_password
 from app.validation import (
     validate_email, validate_username, validate_password,
-    validate_patient_data, sanitize_patient_data, sanitize_string, ValidationError
+    validate_patient_data, sanitize_patient_data, extract_patient_data,
+    sanitize_string, ValidationError
 )
 from app.error_logging import SecurityLogger
 from app import get_mongo_db
+from datetime import datetime
 from functools import wraps
+import atexit
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Dashboard statistics cache
+DASHBOARD_STATS_TTL = 30  # seconds
+_stats_cache = {'value': None, 'expires': 0, 'generation': 0}
+_stats_lock = threading.Lock()
+
+# Pending last_login updates, written in batches off the request path
+LAST_LOGIN_FLUSH_INTERVAL = 10  # seconds
+_pending_logins = {}  # app -> {user_id: login time}
+_pending_lock = threading.Lock()
+_login_flush_timer = None
+
 # Create blueprints
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 patient_bp = Blueprint('patient', __name__, url_prefix='/patient')
@@ -36,33 +53,90 @@ def get_dashboard_stats():
     """
     Helper function to get dashboard statistics.
     Returns a dictionary with total patients, stroke cases, and stroke rate.
+    Results are cached for DASHBOARD_STATS_TTL seconds.
     """
-    mongo_db = get_mongo_db()
-    
-    # Get total patient count
-    total_patients = mongo_db.count_patients()
-
-    # Count stroke cases (iterate in batches if needed)
-    stroke_count = 0
-    batch_size = 1000
-    skip = 0
-    while True:
-        batch = mongo_db.read_all_patients(limit=batch_size, skip=skip)
-        if not batch['success'] or not batch['data']:
-            break
-        for patient in batch['data']:
-            if patient.get('stroke') == 1 or patient.get('stroke') == '1':
-                stroke_count += 1
-        if len(batch['data']) < batch_size:
-            break
-        skip += batch_size
-
-    return {
+    now = time.monotonic()
+    with _stats_lock:
+        if _stats_cache['value'] is not None and now < _stats_cache['expires']:
+            return _stats_cache['value']
+        generation = _stats_cache['generation']
+
+    counts = get_mongo_db().stroke_stats()
+    # A failed query shows zeros for this request only and is not cached
+    total_patients = counts['total'] if counts else 0
+    stroke_count = counts['strokes'] if counts else 0
+
+    stats = {
         'total_patients': total_patients,
         'stroke_cases': stroke_count,
         'stroke_rate': round((stroke_count / total_patients * 100) if total_patients > 0 else 0, 2)
     }
 
+    if counts is None:
+        return stats
+    with _stats_lock:
+        # Drop the result if the cache was invalidated while querying
+        if _stats_cache['generation'] == generation:
+            _stats_cache['value'] = stats
+            _stats_cache['expires'] = now + DASHBOARD_STATS_TTL
+    return stats
+
+
+def invalidate_dashboard_stats():
+    """Expire cached dashboard statistics after patient records change"""
+    with _stats_lock:
+        _stats_cache['expires'] = 0
+        _stats_cache['generation'] += 1
+
+
+def record_login(user_id):
+    """Queue a last_login update for the next batch flush"""
+    global _login_flush_timer
+    app = current_app._get_current_object()
+    with _pending_lock:
+        _pending_logins.setdefault(app, {})[user_id] = datetime.utcnow()
+        if _login_flush_timer is None:
+            _login_flush_timer = threading.Timer(LAST_LOGIN_FLUSH_INTERVAL, flush_pending_logins)
+            _login_flush_timer.daemon = True
+            _login_flush_timer.start()
+
+
+def flush_pending_logins(app=None):
+    """
+    Write queued last_login timestamps, one executemany per app.
+    Flushes every app when none is given. Also runs at exit so updates
+    still queued are not lost.
+    """
+    global _login_flush_timer
+    with _pending_lock:
+        if app is None:
+            batches = list(_pending_logins.items())
+            _pending_logins.clear()
+        else:
+            batches = [(app, _pending_logins.pop(app, {}))]
+        if not _pending_logins and _login_flush_timer is not None:
+            _login_flush_timer.cancel()
+            _login_flush_timer = None
+
+    users = User.__table__
+    stmt = users.update().where(users.c.id == bindparam('user_id')).values(
+        last_login=bindparam('login_time')
+    )
+    for batch_app, pending in batches:
+        if not pending:
+            continue
+        with batch_app.app_context():
+            try:
+                db.session.execute(stmt, [{'user_id': uid, 'login_time': ts}
+                                          for uid, ts in pending.items()])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error updating last login: {str(e)}")
+
+
+atexit.register(flush_pending_logins)
+
 
 # ==================== AUTHENTICATION ROUTES ====================
 
@@ -91,10 +165,15 @@ def register():
             if not is_valid:
                 raise ValidationError(message)
 
-            # Check if user exists
-            if User.query.filter_by(username=username).first():
+            # Check if user exists (single query for username and email)
+            existing = db.session.execute(
+                select(User.username)
+                .where((User.username == username) | (User.email == email))
+                .limit(2)
+            ).all()
+            if any(row.username == username for row in existing):
                 raise ValidationError("Username already exists")
-            if User.query.filter_by(email=email).first():
+            if existing:
                 raise ValidationError("Email already exists")
 
             # Create user
@@ -140,17 +219,21 @@ def login():
             if not username or not password:
                 raise ValidationError("Username and password required")
 
-            user = User.query.filter_by(username=username).first()
+            # Fetch only the columns needed to authenticate (no ORM instance)
+            user = db.session.execute(
+                select(User.id, User.username, User.password_hash,
+                       User.full_name, User.role, User.is_active)
+                .where(User.username == username)
+            ).first()
 
-            if user and user.check_password(password) and user.is_active:
+            if user and verify_password(user.password_hash, password, user.id) and user.is_active:
                 session['user_id'] = user.id
                 session['username'] = user.username
                 session['role'] = user.role
                 session.permanent = True
 
-                # Update last login
-                user.last_login = db.func.now()
-                db.session.commit()
+                # Update last login (batched in the background)
+                record_login(user.id)
 
                 SecurityLogger.log_login_attempt(username, True, request.remote_addr)
                 logger.info(f"User logged in: {username}")
@@ -211,7 +294,7 @@ def add_patient():
     if request.method == 'POST':
         try:
 
-            patient_data = request.form.to_dict()
+            patient_data = extract_patient_data(request.form)
 
             # Convert binary/numeric fields to correct types
             for field in ["hypertension", "stroke"]:
@@ -240,6 +323,7 @@ def add_patient():
             result = mongo_db.create_patient(patient_data)
 
             if result['success']:
+                invalidate_dashboard_stats()
                 SecurityLogger.log_patient_access(session.get('user_id'), result['id'], 'CREATE')
                 flash('Patient record created successfully', 'success')
                 logger.info(f"Patient created by user {session.get('username')}")
@@ -311,17 +395,18 @@ def search_by_id():
         # Get patient from database by ID field
         mongo_db = get_mongo_db()
         result = mongo_db.search_patient_by_id(patient_id)
-        
+        stats = get_dashboard_stats()
+
         if result['success']:
             SecurityLogger.log_patient_access(session.get('user_id'), patient_id, 'READ')
             logger.info(f"Patient {patient_id} accessed by user {session.get('username')}")
-            return render_template('dashboard.html', 
+            return render_template('dashboard.html',
                                  patient=result['data'],
-                                 stats=get_dashboard_stats())
+                                 stats=stats)
         else:
             return render_template('dashboard.html',
                                  search_error=f"Patient not found with ID: {patient_id}",
-                                 stats=get_dashboard_stats())
+                                 stats=stats)
     
     except Exception as e:
         logger.error(f"Error searching patient by ID: {str(e)}")
@@ -341,7 +426,7 @@ def edit_patient(patient_id):
 
     if request.method == 'POST':
         try:
-            update_data = request.form.to_dict()
+            update_data = extract_patient_data(request.form)
 
             # Validate patient data
             is_valid, message = validate_patient_data(update_data)
@@ -355,6 +440,7 @@ def edit_patient(patient_id):
             result = mongo_db.update_patient(patient_id, update_data)
 
             if result['success']:
+                invalidate_dashboard_stats()
                 SecurityLogger.log_patient_access(session.get('user_id'), patient_id, 'UPDATE')
                 flash('Patient record updated successfully', 'success')
                 logger.info(f"Patient {patient_id} updated by {session.get('username')}")
@@ -397,6 +483,7 @@ def delete_patient(patient_id):
         result = mongo_db.delete_patient(patient_id)
 
         if result['success']:
+            invalidate_dashboard_stats()
             SecurityLogger.log_patient_access(session.get('user_id'), patient_id, 'DELETE')
             flash('Patient record deleted successfully', 'success')
             logger.info(f"Patient {patient_id} deleted by {session.get('username')}")
@@ -3,9 +3,33 @@ Input validation and sanitization utilities
 SECURITY FEATURE: Input Validation & Sanitization
 """
 import re
+import string
 from markupsafe import escape
 from typing import Tuple
 
+# Precompiled validation patterns
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', re.ASCII)
+_USERNAME_RE = re.compile(r'^[a-zA-Z0-9_-]{3,20}$', re.ASCII)
+
+# Password character classes
+_UPPERS = frozenset(string.ascii_uppercase)
+_LOWERS = frozenset(string.ascii_lowercase)
+_SPECIALS = frozenset('!@#$%^&*()_+-=[]{};:,.<>?')
+
+# Fields accepted on patient records
+PATIENT_FIELDS = ('gender', 'age', 'hypertension', 'ever_married', 'work_type',
+                  'Residence_type', 'avg_glucose_level', 'bmi', 'smoking_status', 'stroke')
+MAX_FORM_FIELDS = 20
+_REQUIRED_PATIENT_FIELDS = tuple(f for f in PATIENT_FIELDS if f != 'stroke')
+_NUMERIC_RANGES = (
+    ('age', 0, 120, 'Age'),
+    ('avg_glucose_level', 0, 500, 'Glucose level'),
+    ('bmi', 0, 100, 'BMI'),
+)
+_GENDERS = ('Male', 'Female', 'Other')
+_VALID_GENDERS = frozenset(_GENDERS)
+_VALID_BINARY = frozenset(('0', '1', 0, 1))
+
 
 class ValidationError(Exception):
     """Custom validation exception"""
@@ -16,10 +40,14 @@ def sanitize_string(value: str) -> str:
     """
     Sanitize string input to prevent XSS attacks.
     Escapes HTML special characters.
+    Plain ASCII alphanumeric tokens cannot contain markup and skip escaping.
     """
     if not isinstance(value, str):
         raise ValidationError("Input must be a string")
-    return escape(value).strip()
+    value = value.strip()
+    if value.isascii() and value.isalnum():
+        return value
+    return str(escape(value))
 
 
 def validate_email(email: str) -> bool:
@@ -27,9 +55,7 @@ def validate_email(email: str) -> bool:
     Validate email format.
     Prevents invalid email addresses from being stored.
     """
-    email = sanitize_string(email)
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return bool(_EMAIL_RE.match(email.strip()))
 
 
 def validate_username(username: str) -> bool:
@@ -37,9 +63,7 @@ def validate_username(username: str) -> bool:
     Validate username format.
     Only allows alphanumeric characters, underscores, and hyphens.
     """
-    username = sanitize_string(username)
-    pattern = r'^[a-zA-Z0-9_-]{3,20}$'
-    return bool(re.match(pattern, username))
+    return bool(_USERNAME_RE.match(username.strip()))
 
 
 def validate_password(password: str) -> Tuple[bool, str]:
@@ -49,76 +73,73 @@ def validate_password(password: str) -> Tuple[bool, str]:
     """
     if len(password) < 8:
         return False, "Password must be at least 8 characters long"
-    if not re.search(r'[A-Z]', password):
+    chars = set(password)
+    if chars.isdisjoint(_UPPERS):
         return False, "Password must contain an uppercase letter"
-    if not re.search(r'[a-z]', password):
+    if chars.isdisjoint(_LOWERS):
         return False, "Password must contain a lowercase letter"
-    if not re.search(r'\d', password):
+    if not any(ch.isdecimal() for ch in chars):
         return False, "Password must contain a number"
-    if not re.search(r'[!@#$%^&*()_+\-=\[\]{};:,.<>?]', password):
+    if chars.isdisjoint(_SPECIALS):
         return False, "Password must contain a special character"
     return True, "Password is valid"
 
 
+def _check_range(value, low, high, label: str):
+    """Return an error message if value is not a number within [low, high]"""
+    try:
+        number = float(value)
+    except (ValueError, TypeError):
+        return f"{label} must be a valid number"
+    if number < low or number > high:
+        return f"{label} must be between {low} and {high}"
+    return None
+
+
 def validate_patient_data(data: dict) -> Tuple[bool, str]:
     """
     Validate patient record data.
     Ensures all required fields are present and valid.
     """
-    required_fields = ['gender', 'age', 'hypertension', 'ever_married', 
-                      'work_type', 'Residence_type', 'avg_glucose_level', 
-                      'bmi', 'smoking_status']
-    
     # Check required fields
-    for field in required_fields:
+    for field in _REQUIRED_PATIENT_FIELDS:
         if field not in data:
             return False, f"Missing required field: {field}"
-    
-    # Validate age
-    try:
-        age = float(data.get('age', 0))
-        if age < 0 or age > 120:
-            return False, "Age must be between 0 and 120"
-    except (ValueError, TypeError):
-        return False, "Age must be a valid number"
-    
-    # Validate glucose level
-    try:
-        glucose = float(data.get('avg_glucose_level', 0))
-        if glucose < 0 or glucose > 500:
-            return False, "Glucose level must be between 0 and 500"
-    except (ValueError, TypeError):
-        return False, "Glucose level must be a valid number"
-    
-    # Validate BMI
-    try:
-        bmi = float(data.get('bmi', 0))
-        if bmi < 0 or bmi > 100:
-            return False, "BMI must be between 0 and 100"
-    except (ValueError, TypeError):
-        return False, "BMI must be a valid number"
-    
+
+    # Validate numeric ranges
+    for field, low, high, label in _NUMERIC_RANGES:
+        error = _check_range(data.get(field, 0), low, high, label)
+        if error:
+            return False, error
+
     # Validate gender
-    valid_genders = ['Male', 'Female', 'Other']
-    if sanitize_string(data.get('gender', '')) not in valid_genders:
-        return False, f"Gender must be one of {valid_genders}"
-    
+    if sanitize_string(data.get('gender', '')) not in _VALID_GENDERS:
+        return False, f"Gender must be one of {list(_GENDERS)}"
+
     # Validate binary fields
-    valid_binary = ['0', '1', 0, 1]
-    if data.get('hypertension') not in valid_binary:
+    if data.get('hypertension') not in _VALID_BINARY:
         return False, "Hypertension must be 0 or 1"
-    
+
     return True, "Data is valid"
 
 
 def sanitize_patient_data(data: dict) -> dict:
     """
     Sanitize patient data to prevent injection attacks.
+    Only known patient fields are kept.
+    """
+    return {
+        key: sanitize_string(value) if isinstance(value, str) else value
+        for key in PATIENT_FIELDS
+        if (value := data.get(key)) is not None
+    }
+
+
+def extract_patient_data(form) -> dict:
+    """
+    Copy known patient fields from submitted form data.
+    Rejects oversized submissions before any per-field work is done.
     """
-    sanitized = {}
-    for key, value in data.items():
-        if isinstance(value, str):
-            sanitized[key] = sanitize_string(value)
-        else:
-            sanitized[key] = value
-    return sanitized
+    if len(form) > MAX_FORM_FIELDS:
+        raise ValidationError("Too many form fields submitted")
+    return {field: form[field] for field in PATIENT_FIELDS if field in form}
@@ -8,6 +8,9 @@ SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 # Database Configuration - SQLite for User Authentication
 SQLALCHEMY_DATABASE_URI = 'sqlite:///hospital_auth.db'
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'connect_args': {'check_same_thread': False}
+}
 
 # MongoDB Configuration for Patient Records
 MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/stroke_prediction')
@@ -19,6 +22,7 @@ SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Lax'
 
 # Security Settings
+PASSWORD_HASH_METHOD = 'pbkdf2:sha256'
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
 WTF_CSRF_TIME_LIMIT = None
 WTF_CSRF_ENABLED = True
@@ -1,28 +1,175 @@
 """
 Script to seed initial test data for the application
 Run this after setting up the database
+
+Usage: python seed_data.py [path/to/healthcare-dataset-stroke-data.csv]
 """
 import os
 import sys
 import csv
+import hashlib
 from datetime import datetime
+from itertools import islice
+
+# Documents per insert_many call when seeding patients
+SEED_BATCH_SIZE = int(os.environ.get('SEED_BATCH_SIZE', 10000))
+
+# Seed data is disposable, so skip write acknowledgements unless disabled
+SEED_FAST_INSERT = os.environ.get('SEED_FAST_INSERT', '1') == '1'
+
+# Sample patient data (documents are copied before insertion)
+_SAMPLE_PATIENTS = (
+    {
+        'gender': 'Male',
+        'age': 67,
+        'hypertension': 1,
+        'ever_married': 'Yes',
+        'work_type': 'Private',
+        'Residence_type': 'Urban',
+        'avg_glucose_level': 228.69,
+        'bmi': 36.6,
+        'smoking_status': 'formerly smoked',
+        'stroke': 1
+    },
+    {
+        'gender': 'Female',
+        'age': 61,
+        'hypertension': 1,
+        'ever_married': 'Yes',
+        'work_type': 'Self-employed',
+        'Residence_type': 'Rural',
+        'avg_glucose_level': 202.21,
+        'bmi': 0,
+        'smoking_status': 'unknown',
+        'stroke': 1
+    },
+    {
+        'gender': 'Male',
+        'age': 80,
+        'hypertension': 1,
+        'ever_married': 'Yes',
+        'work_type': 'Private',
+        'Residence_type': 'Rural',
+        'avg_glucose_level': 105.92,
+        'bmi': 32.5,
+        'smoking_status': 'never smoked',
+        'stroke': 1
+    },
+    {
+        'gender': 'Female',
+        'age': 49,
+        'hypertension': 0,
+        'ever_married': 'Yes',
+        'work_type': 'Private',
+        'Residence_type': 'Urban',
+        'avg_glucose_level': 171.23,
+        'bmi': 34.4,
+        'smoking_status': 'smokes',
+        'stroke': 1
+    },
+    {
+        'gender': 'Male',
+        'age': 35,
+        'hypertension': 0,
+        'ever_married': 'No',
+        'work_type': 'Private',
+        'Residence_type': 'Urban',
+        'avg_glucose_level': 95.5,
+        'bmi': 28.7,
+        'smoking_status': 'never smoked',
+        'stroke': 0
+    },
+    {
+        'gender': 'Female',
+        'age': 28,
+        'hypertension': 0,
+        'ever_married': 'Yes',
+        'work_type': 'Govt_job',
+        'Residence_type': 'Rural',
+        'avg_glucose_level': 88.9,
+        'bmi': 22.1,
+        'smoking_status': 'never smoked',
+        'stroke': 0
+    },
+    {
+        'gender': 'Male',
+        'age': 45,
+        'hypertension': 1,
+        'ever_married': 'Yes',
+        'work_type': 'Private',
+        'Residence_type': 'Urban',
+        'avg_glucose_level': 125.3,
+        'bmi': 30.5,
+        'smoking_status': 'formerly smoked',
+        'stroke': 0
+    },
+    {
+        'gender': 'Female',
+        'age': 72,
+        'hypertension': 1,
+        'ever_married': 'Yes',
+        'work_type': 'Never_worked',
+        'Residence_type': 'Urban',
+        'avg_glucose_level': 180.4,
+        'bmi': 35.2,
+        'smoking_status': 'never smoked',
+        'stroke': 1
+    },
+)
+
+
+def _coerce_patient(row: dict, fields) -> dict:
+    """Convert a CSV row into a patient document with typed numeric fields"""
+    patient = {field: row[field] for field in fields if field in row}
+    for field in ('hypertension', 'stroke'):
+        if field in patient:
+            patient[field] = int(patient[field])
+    for field in ('age', 'avg_glucose_level', 'bmi'):
+        if field in patient:
+            try:
+                patient[field] = float(patient[field])
+            except ValueError:
+                patient[field] = 0  # Dataset marks missing values as 'N/A'
+    return patient
+
 
-# Add parent directory to path
-sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+def _stable_id(key: str):
+    """Derive a deterministic ObjectId from a string key"""
+    # bson ships with pymongo, so it is imported only when seeding
+    from bson.objectid import ObjectId
 
-from app import create_app, get_mongo_db
-from app.models import db, User
+    return ObjectId(hashlib.sha1(key.encode('utf-8')).digest()[:12])
+
+
+def _content_id(patient: dict):
+    """Derive a stable _id from a patient's contents (built-in samples only)"""
+    return _stable_id(repr(sorted(patient.items())))
+
+
+def _read_csv_patients(f):
+    """
+    Yield patient documents from a stroke dataset CSV file object.
+    Each _id is derived from the row's own 'id' column, so distinct patients
+    with identical attributes are still stored separately.
+    """
+    from app.validation import PATIENT_FIELDS
+
+    for row in csv.DictReader(f):
+        patient = _coerce_patient(row, PATIENT_FIELDS)
+        patient['_id'] = _stable_id(f"csv:{row['id']}")
+        yield patient
 
 
 def seed_test_users():
     """Create test users for demonstration"""
+    # Imported here so loading this module does not pull in Flask/SQLAlchemy
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+    from werkzeug.security import generate_password_hash
+    from app import create_app
+    from app.models import db, User
+
     app = create_app()
     with app.app_context():
-        # Check if users exist
-        if User.query.filter_by(username='doctor1').first():
-            print("Test users already exist, skipping...")
-            return
-
         # Create test users
         users_data = [
             {
@@ -45,138 +192,88 @@ def seed_test_users():
             }
         ]
 
-        for user_data in users_data:
-            user = User(**user_data)
-            user.set_password('TestPassword123!')  # Default password for testing
-            db.session.add(user)
-            print(f"Created user: {user_data['username']}")
+        # All seed users share the default test password, so hash it once.
+        # Only valid for fixtures: real users must each get their own salt.
+        shared_hash = generate_password_hash('TestPassword123!',
+                                             method=app.config['PASSWORD_HASH_METHOD'])
+        rows = [dict(user_data, password_hash=shared_hash) for user_data in users_data]
 
+        # Idempotent multi-row INSERT: existing users are left untouched
+        stmt = sqlite_insert(User.__table__).values(rows).on_conflict_do_nothing()
+        result = db.session.execute(stmt)
         db.session.commit()
-        print(f"✓ Created {len(users_data)} test users")
+
+        if result.rowcount == 0:
+            print("Test users already exist, skipping...")
+            return
+        print(f"✓ Created {result.rowcount} test users")
 
 
-def seed_sample_patients():
-    """Load sample patient data into MongoDB"""
+def seed_sample_patients(patients_iter=None, batch_size=None):
+    """
+    Load sample patient data into MongoDB.
+    Accepts any iterable of patient dicts (defaults to the built-in samples)
+    and inserts it in batches, so only one batch is held in memory.
+    Each patient is upserted under a stable _id (its own, or one derived
+    from its contents), so re-running the seed only adds missing patients.
+    """
+    from pymongo import WriteConcern
+    from app import get_mongo_db
+
     mongo_db = get_mongo_db()
 
-    if not mongo_db or not mongo_db.patients_collection:
+    if mongo_db is None or mongo_db.patients_collection is None:
         print("MongoDB is not connected. Ensure MongoDB service is running.")
         return
 
-    # Check if patients exist
-    existing = mongo_db.patients_collection.count_documents({})
-    if existing > 0:
-        print(f"Database already contains {existing} patients, skipping seed...")
-        return
+    # Insert patients one batch per round-trip
+    patients = iter(_SAMPLE_PATIENTS if patients_iter is None else patients_iter)
+    batch_size = batch_size or SEED_BATCH_SIZE
+    write_concern = WriteConcern(w=0) if SEED_FAST_INSERT else None
+    total = 0
+    acknowledged = True
+    while True:
+        batch = [patient if '_id' in patient else dict(patient, _id=_content_id(patient))
+                 for patient in islice(patients, batch_size)]
+        if not batch:
+            break
+        result = mongo_db.upsert_patients_bulk(batch, write_concern=write_concern,
+                                               bypass_document_validation=True)
+        total += result['count']
+        acknowledged = acknowledged and result['acknowledged']
+        if not result['success']:
+            print(f"✗ Seeding stopped after {total} patients: {result['error']}")
+            return
 
-    # Sample patient data
-    sample_patients = [
-        {
-            'gender': 'Male',
-            'age': 67,
-            'hypertension': 1,
-            'ever_married': 'Yes',
-            'work_type': 'Private',
-            'Residence_type': 'Urban',
-            'avg_glucose_level': 228.69,
-            'bmi': 36.6,
-            'smoking_status': 'formerly smoked',
-            'stroke': 1
-        },
-        {
-            'gender': 'Female',
-            'age': 61,
-            'hypertension': 1,
-            'ever_married': 'Yes',
-            'work_type': 'Self-employed',
-            'Residence_type': 'Rural',
-            'avg_glucose_level': 202.21,
-            'bmi': 0,
-            'smoking_status': 'unknown',
-            'stroke': 1
-        },
-        {
-            'gender': 'Male',
-            'age': 80,
-            'hypertension': 1,
-            'ever_married': 'Yes',
-            'work_type': 'Private',
-            'Residence_type': 'Rural',
-            'avg_glucose_level': 105.92,
-            'bmi': 32.5,
-            'smoking_status': 'never smoked',
-            'stroke': 1
-        },
-        {
-            'gender': 'Female',
-            'age': 49,
-            'hypertension': 0,
-            'ever_married': 'Yes',
-            'work_type': 'Private',
-            'Residence_type': 'Urban',
-            'avg_glucose_level': 171.23,
-            'bmi': 34.4,
-            'smoking_status': 'smokes',
-            'stroke': 1
-        },
-        {
-            'gender': 'Male',
-            'age': 35,
-            'hypertension': 0,
-            'ever_married': 'No',
-            'work_type': 'Private',
-            'Residence_type': 'Urban',
-            'avg_glucose_level': 95.5,
-            'bmi': 28.7,
-            'smoking_status': 'never smoked',
-            'stroke': 0
-        },
-        {
-            'gender': 'Female',
-            'age': 28,
-            'hypertension': 0,
-            'ever_married': 'Yes',
-            'work_type': 'Govt_job',
-            'Residence_type': 'Rural',
-            'avg_glucose_level': 88.9,
-            'bmi': 22.1,
-            'smoking_status': 'never smoked',
-            'stroke': 0
-        },
-        {
-            'gender': 'Male',
-            'age': 45,
-            'hypertension': 1,
-            'ever_married': 'Yes',
-            'work_type': 'Private',
-            'Residence_type': 'Urban',
-            'avg_glucose_level': 125.3,
-            'bmi': 30.5,
-            'smoking_status': 'formerly smoked',
-            'stroke': 0
-        },
-        {
-            'gender': 'Female',
-            'age': 72,
-            'hypertension': 1,
-            'ever_married': 'Yes',
-            'work_type': 'Never_worked',
-            'Residence_type': 'Urban',
-            'avg_glucose_level': 180.4,
-            'bmi': 35.2,
-            'smoking_status': 'never smoked',
-            'stroke': 1
-        },
-    ]
-
-    # Insert patients
-    for patient in sample_patients:
-        mongo_db.create_patient(patient)
-
-    print(f"✓ Seeded {len(sample_patients)} sample patients into MongoDB")
+    if not acknowledged:
+        # Unacknowledged writes cannot tell new patients from existing ones
+        print(f"✓ Sent {total} sample patients to MongoDB (unacknowledged)")
+    elif total == 0:
+        print("Sample patients already exist, skipping...")
+    else:
+        print(f"✓ Seeded {total} sample patients into MongoDB")
+
+
+def seed_from_csv(path, batch_size=None):
+    """
+    Stream patients from a stroke dataset CSV into MongoDB.
+    Rows are read lazily and inserted in batches, so only one batch is
+    held in memory regardless of file size.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        seed_sample_patients(_read_csv_patients(f), batch_size)
 
 
 if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else None
+    # Check arguments before anything is written to either database
+    if len(sys.argv) > 2 or (csv_path is not None and csv_path.startswith('-')):
+        print("Usage: python seed_data.py [path/to/healthcare-dataset-stroke-data.csv]")
+        sys.exit(0 if csv_path in ('-h', '--help') else 2)
+    if csv_path is not None and not os.path.isfile(csv_path):
+        print(f"✗ CSV file not found: {csv_path}")
+        sys.exit(2)
+
     print("=" * 50)
     print("Database Seeding Script")
     print("=" * 50)
@@ -185,8 +282,12 @@ if __name__ == '__main__':
         print("\n1. Creating test users (SQLite)...")
         seed_test_users()
 
-        print("\n2. Loading sample patient data (MongoDB)...")
-        seed_sample_patients()
+        if csv_path is not None:
+            print(f"\n2. Loading patient data from {csv_path} (MongoDB)...")
+            seed_from_csv(csv_path)
+        else:
+            print("\n2. Loading sample patient data (MongoDB)...")
+            seed_sample_patients()
 
         print("\n" + "=" * 50)
         print("✓ Seeding complete!")
@@ -1,39 +1,66 @@
 """
 Unit tests for authentication and validation
 """
+import io
 import unittest
-import sys
-import os
-
-# Add parent directory to path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from unittest import mock
+from sqlalchemy.pool import StaticPool
+from werkzeug.security import check_password_hash
 
 from app import create_app
 from app.models import db, User
+from app.routes import flush_pending_logins, get_dashboard_stats, invalidate_dashboard_stats
 from app.validation import (
     validate_email, validate_username, validate_password,
-    validate_patient_data, sanitize_string
+    validate_patient_data, sanitize_patient_data, sanitize_string
 )
-
-
-class AuthenticationTestCase(unittest.TestCase):
-    """Test user authentication and registration"""
+from seed_data import _read_csv_patients, seed_sample_patients
+
+TEST_CONFIG = {
+    'TESTING': True,
+    'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+    # One shared in-memory database for every connection in the process
+    'SQLALCHEMY_ENGINE_OPTIONS': {
+        'poolclass': StaticPool,
+        'connect_args': {'check_same_thread': False}
+    },
+    'WTF_CSRF_ENABLED': False,
+    # Same algorithm, single iteration: keeps hashing tests fast
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1'
+}
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Base test case sharing one app and schema across a test class"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Create the app once per class; create_app also creates the tables"""
+        cls.app = create_app(test_config=TEST_CONFIG)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Drop the database tables"""
+        with cls.app.app_context():
+            db.session.remove()
+            db.drop_all()
 
     def setUp(self):
-        """Set up test client and database"""
-        self.app = create_app()
-        self.app.config['TESTING'] = True
-        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        """Set up test client"""
         self.client = self.app.test_client()
 
-        with self.app.app_context():
-            db.create_all()
-
     def tearDown(self):
-        """Clean up after tests"""
+        """Remove rows written by the test"""
         with self.app.app_context():
+            db.session.rollback()
+            for table in reversed(db.metadata.sorted_tables):
+                db.session.execute(table.delete())
+            db.session.commit()
             db.session.remove()
-            db.drop_all()
+
+
+class AuthenticationTestCase(DatabaseTestCase):
+    """Test user authentication and registration"""
 
     def test_user_registration(self):
         """Test successful user registration"""
@@ -69,6 +96,36 @@ class AuthenticationTestCase(unittest.TestCase):
             self.assertTrue(user.check_password(password))
             self.assertFalse(user.check_password('WrongPassword'))
 
+    def test_password_verify_cache(self):
+        """Test cached verification is invalidated on password change"""
+        with self.app.app_context():
+            user = User(
+                username='testuser4',
+                email='test4@example.com',
+                full_name='Test User 4'
+            )
+            user.set_password('TestPassword123!')
+            db.session.add(user)
+            db.session.commit()
+
+            with mock.patch('app.models.check_password_hash',
+                            wraps=check_password_hash) as check_hash:
+                # Repeat verification hits the cache
+                self.assertTrue(user.check_password('TestPassword123!'))
+                self.assertTrue(user.check_password('TestPassword123!'))
+                self.assertEqual(check_hash.call_count, 1)
+
+                # Failures are never cached
+                self.assertFalse(user.check_password('WrongPassword'))
+                self.assertEqual(check_hash.call_count, 2)
+
+                # Old password must not verify from the cache after a change
+                user.set_password('NewPassword456!')
+                self.assertFalse(user.check_password('TestPassword123!'))
+                self.assertEqual(check_hash.call_count, 3)
+                self.assertTrue(user.check_password('NewPassword456!'))
+                self.assertEqual(check_hash.call_count, 4)
+
     def test_weak_password_rejection(self):
         """Test that weak passwords are rejected"""
         with self.app.app_context():
@@ -82,35 +139,50 @@ class AuthenticationTestCase(unittest.TestCase):
                 user.set_password('weak')
 
 
+_EMAIL_CASES = (
+    ('test@example.com', True),
+    ('user.name@example.co.uk', True),
+    ('invalid.email', False),
+    ('user@', False),
+)
+
+_USERNAME_CASES = (
+    ('valid_user', True),
+    ('user-123', True),
+    ('ab', False),  # Too short
+    ('invalid@user', False),  # Invalid character
+)
+
+# (password, expected validity, expected message fragment)
+_PASSWORD_CASES = (
+    ('TestPass123!', True, 'valid'),
+    ('weak', False, '8 characters'),
+    ('nocapital123!', False, 'uppercase'),
+)
+
+
 class ValidationTestCase(unittest.TestCase):
     """Test input validation functions"""
 
     def test_email_validation(self):
         """Test email validation"""
-        self.assertTrue(validate_email('test@example.com'))
-        self.assertTrue(validate_email('user.name@example.co.uk'))
-        self.assertFalse(validate_email('invalid.email'))
-        self.assertFalse(validate_email('user@'))
+        for email, expected in _EMAIL_CASES:
+            with self.subTest(email=email):
+                self.assertEqual(validate_email(email), expected)
 
     def test_username_validation(self):
         """Test username validation"""
-        self.assertTrue(validate_username('valid_user'))
-        self.assertTrue(validate_username('user-123'))
-        self.assertFalse(validate_username('ab'))  # Too short
-        self.assertFalse(validate_username('invalid@user'))  # Invalid character
+        for username, expected in _USERNAME_CASES:
+            with self.subTest(username=username):
+                self.assertEqual(validate_username(username), expected)
 
     def test_password_validation(self):
         """Test password strength validation"""
-        is_valid, msg = validate_password('TestPass123!')
-        self.assertTrue(is_valid)
-
-        is_valid, msg = validate_password('weak')
-        self.assertFalse(is_valid)
-        self.assertIn('8 characters', msg)
-
-        is_valid, msg = validate_password('nocapital123!')
-        self.assertFalse(is_valid)
-        self.assertIn('uppercase', msg)
+        for password, expected, fragment in _PASSWORD_CASES:
+            with self.subTest(password=password):
+                is_valid, msg = validate_password(password)
+                self.assertEqual(is_valid, expected)
+                self.assertIn(fragment, msg)
 
     def test_sanitize_string(self):
         """Test string sanitization for XSS prevention"""
@@ -153,20 +225,27 @@ class ValidationTestCase(unittest.TestCase):
         is_valid, msg = validate_patient_data(incomplete_data)
         self.assertFalse(is_valid)
 
+    def test_sanitize_patient_data_drops_unknown_fields(self):
+        """Test only known patient fields survive sanitization"""
+        data = {
+            'gender': 'Male',
+            'age': 45,
+            'csrf_token': 'abc123',
+            'is_admin': '1'
+        }
+        sanitized = sanitize_patient_data(data)
+        self.assertEqual(set(sanitized), {'gender', 'age'})
+
 
-class CRUDTestCase(unittest.TestCase):
+class CRUDTestCase(DatabaseTestCase):
     """Test CRUD operations"""
 
-    def setUp(self):
-        """Set up test environment"""
-        self.app = create_app()
-        self.app.config['TESTING'] = True
-        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-        self.client = self.app.test_client()
+    @classmethod
+    def setUpClass(cls):
+        """Create the shared test user once for the class"""
+        super().setUpClass()
 
-        with self.app.app_context():
-            db.create_all()
-            # Create test user
+        with cls.app.app_context():
             user = User(
                 username='testuser',
                 email='test@example.com',
@@ -175,12 +254,18 @@ class CRUDTestCase(unittest.TestCase):
             user.set_password('TestPassword123!')
             db.session.add(user)
             db.session.commit()
+            cls.test_user_id = user.id
 
     def tearDown(self):
-        """Clean up"""
+        """Remove rows written by the test, keeping the shared user"""
+        # Write queued logins now and cancel the pending flush timer
+        flush_pending_logins(self.app)
         with self.app.app_context():
+            db.session.rollback()
+            User.query.filter(User.id != self.test_user_id).delete()
+            User.query.update({User.last_login: None})
+            db.session.commit()
             db.session.remove()
-            db.drop_all()
 
     def test_user_login(self):
         """Test user login functionality"""
@@ -192,6 +277,18 @@ class CRUDTestCase(unittest.TestCase):
         # Check login was successful
         self.assertEqual(response.status_code, 200)
 
+    def test_login_updates_last_login(self):
+        """Test queued last_login updates are written by the batch flush"""
+        self.client.post('/auth/login', data={
+            'username': 'testuser',
+            'password': 'TestPassword123!'
+        })
+        flush_pending_logins(self.app)
+
+        with self.app.app_context():
+            user = db.session.get(User, self.test_user_id)
+            self.assertIsNotNone(user.last_login)
+
     def test_invalid_login(self):
         """Test invalid login attempt"""
         response = self.client.post('/auth/login', data={
@@ -203,5 +300,88 @@ class CRUDTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
 
 
-if __name__ == '__main__':
-    unittest.main()
+class DashboardStatsTestCase(unittest.TestCase):
+    """Test dashboard statistics caching"""
+
+    def setUp(self):
+        """Start each test with an expired cache and a mocked MongoDB"""
+        invalidate_dashboard_stats()
+        self.mongo_db = mock.Mock()
+        self.mongo_db.stroke_stats.return_value = {'total': 8, 'strokes': 3}
+        patcher = mock.patch('app.routes.get_mongo_db', return_value=self.mongo_db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(invalidate_dashboard_stats)
+
+    def test_stats_cached_within_ttl(self):
+        """Test a second call within the TTL does not query again"""
+        first = get_dashboard_stats()
+        second = get_dashboard_stats()
+        self.assertEqual(first, second)
+        self.mongo_db.stroke_stats.assert_called_once()
+
+    def test_invalidate_forces_fresh_query(self):
+        """Test invalidation makes the next call re-query MongoDB"""
+        get_dashboard_stats()
+        self.mongo_db.stroke_stats.return_value = {'total': 9, 'strokes': 4}
+        invalidate_dashboard_stats()
+
+        stats = get_dashboard_stats()
+        self.assertEqual(self.mongo_db.stroke_stats.call_count, 2)
+        self.assertEqual(stats['total_patients'], 9)
+
+    def test_invalidate_during_query_not_lost(self):
+        """Test a result computed before an invalidation is not cached"""
+        def stale_stats():
+            invalidate_dashboard_stats()  # A patient is added mid-query
+            return {'total': 8, 'strokes': 3}
+
+        self.mongo_db.stroke_stats.side_effect = stale_stats
+        get_dashboard_stats()
+
+        self.mongo_db.stroke_stats.side_effect = None
+        self.mongo_db.stroke_stats.return_value = {'total': 9, 'strokes': 3}
+        self.assertEqual(get_dashboard_stats()['total_patients'], 9)
+
+    def test_failed_query_not_cached(self):
+        """Test a failed aggregation shows zeros without being cached"""
+        self.mongo_db.stroke_stats.return_value = None
+        self.assertEqual(get_dashboard_stats()['total_patients'], 0)
+
+        self.mongo_db.stroke_stats.return_value = {'total': 8, 'strokes': 3}
+        self.assertEqual(get_dashboard_stats()['total_patients'], 8)
+        self.assertEqual(self.mongo_db.stroke_stats.call_count, 2)
+
+    def test_stroke_rate_from_aggregate(self):
+        """Test stroke rate is computed from the aggregated counts"""
+        stats = get_dashboard_stats()
+        self.assertEqual(stats, {
+            'total_patients': 8,
+            'stroke_cases': 3,
+            'stroke_rate': 37.5
+        })
+
+
+_CSV_HEADER = ('id,gender,age,hypertension,heart_disease,ever_married,work_type,'
+               'Residence_type,avg_glucose_level,bmi,smoking_status,stroke\n')
+_CSV_VALUES = 'Male,67,0,1,Yes,Private,Urban,228.69,36.6,formerly smoked,1\n'
+
+
+class SeedDataTestCase(unittest.TestCase):
+    """Test CSV seeding helpers"""
+
+    def test_identical_csv_rows_keep_distinct_ids(self):
+        """Test rows with identical values but different ids are both seeded"""
+        csv_file = io.StringIO(_CSV_HEADER + '51676,' + _CSV_VALUES + '51677,' + _CSV_VALUES)
+        mongo_db = mock.Mock()
+        mongo_db.upsert_patients_bulk.return_value = {
+            'success': True, 'count': 2, 'acknowledged': True
+        }
+
+        with mock.patch('app.get_mongo_db', return_value=mongo_db):
+            seed_sample_patients(_read_csv_patients(csv_file))
+
+        batch = mongo_db.upsert_patients_bulk.call_args[0][0]
+        self.assertEqual(len(batch), 2)
+        self.assertNotEqual(batch[0]['_id'], batch[1]['_id'])
+        self.assertNotIn('id', batch[0])
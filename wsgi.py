@@ -2,10 +2,11 @@
 Application entry point with environment setup
 """
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file (production injects them directly)
+if os.environ.get('FLASK_ENV') != 'production':
+    from dotenv import load_dotenv
+    load_dotenv()
 
 # Set Flask app
 os.environ.setdefault('FLASK_APP', 'run.py')